@@ -18,6 +18,6 @@
 
 from .client import run_client_command
 from .config import Config
-from .constants import CommandStatus, CameraStatus, CoolerMode
+from .constants import CameraCommand, CommandStatus, CameraStatus, CoolerMode
 from .outputprocess import output_process
 from .qhyprocess import qhy_process
@@ -24,7 +24,7 @@ from .constants import CommandStatus, CameraStatus, CoolerMode
 
 def run_client_command(config_path, usage_prefix, args):
     """Prints the message associated with a status code and returns the code"""
-    config = Config(config_path)
+    config = Config.from_json_file(config_path)
     commands = {
         'temperature': set_temperature,
         'exposure': set_exposure,
@@ -20,6 +20,23 @@
 # pylint: disable=invalid-name
 
 
+class CameraCommand:
+    """Commands sent over the pipe from the daemon to the camera process.
+       Messages are positional tuples of (command, *handler arguments)"""
+    Temperature = 0
+    Stream = 1
+    Gain = 2
+    Offset = 3
+    Exposure = 4
+    Window = 5
+    Binning = 6
+    Start = 7
+    Stop = 8
+    Filter = 9
+    Status = 10
+    Shutdown = 11
+
+
 class CommandStatus:
     """Numeric return codes"""
     # General error codes
@@ -20,6 +20,7 @@
 # pylint: disable=too-many-branches
 
 from ctypes import c_uint8, c_uint16, c_uint32, Structure
+from dataclasses import dataclass
 import os.path
 import shutil
 from astropy.io import fits
@@ -95,6 +96,53 @@ class GPSData(Structure):
         return int.from_bytes(self._PPSDelta, byteorder='big', signed=False)
 
 
+@dataclass
+class FrameMeta:
+    """Per-frame metadata passed from the acquisition loop to the output workers.
+       Slots keep the pickle payload and attribute access cheaper than a dict
+       (declared by hand as dataclass slots support needs Python 3.10)."""
+    __slots__ = (
+        'data_offset', 'data_width', 'data_height', 'requested_exposure', 'exposure',
+        'lineperiod', 'frameperiod', 'readout_offset', 'mode', 'mode_name', 'gain',
+        'offset', 'stream', 'read_end_time', 'filter', 'sdk_version', 'firmware_version',
+        'cooler_mode', 'cooler_temperature', 'cooler_humidity', 'cooler_pressure',
+        'cooler_pwm', 'cooler_setpoint', 'window_region', 'binning', 'binning_method',
+        'image_region', 'bias_region', 'dark_region', 'exposure_count',
+        'exposure_count_reference')
+
+    data_offset: int
+    data_width: int
+    data_height: int
+    requested_exposure: float
+    exposure: float
+    lineperiod: float
+    frameperiod: float
+    readout_offset: float
+    mode: int
+    mode_name: str
+    gain: int
+    offset: int
+    stream: bool
+    read_end_time: int
+    filter: str
+    sdk_version: str
+    firmware_version: str
+    cooler_mode: int
+    cooler_temperature: float
+    cooler_humidity: float
+    cooler_pressure: float
+    cooler_pwm: float
+    cooler_setpoint: float
+    window_region: list
+    binning: int
+    binning_method: str
+    image_region: list
+    bias_region: list
+    dark_region: list
+    exposure_count: int
+    exposure_count_reference: str
+
+
 def window_sensor_region(region, window):
     """Calculate new region coordinates when cropped to a given window"""
     x1 = max(0, region[0] - window[0])
@@ -131,25 +179,41 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
     and multiple worker processes allow frames to be handled in parallel.
     """
     pipeline_daemon = getattr(daemons, pipeline_daemon_name)
+
+    # numpy views into the shared framebuffer are cached per slot and shape
+    # so the per-frame cost is just the pixel copy, not ndarray construction.
+    # The shape key matters because the readout geometry (and therefore the
+    # slot layout) can change between sequences
+    framebuffer_views = {}
     while True:
         frame = process_queue.get()
 
-        data = np.frombuffer(processing_framebuffer, dtype=np.uint16,
-                             offset=frame['data_offset'], count=frame['data_height'] * frame['data_width']) \
-            .reshape((frame['data_height'], frame['data_width'])).copy()
-        processing_framebuffer_offsets.put(frame['data_offset'])
+        view_key = (frame.data_offset, frame.data_height, frame.data_width)
+        view = framebuffer_views.get(view_key)
+        if view is None:
+            view = np.frombuffer(processing_framebuffer, dtype=np.uint16,
+                                 offset=frame.data_offset, count=frame.data_height * frame.data_width) \
+                .reshape((frame.data_height, frame.data_width))
+            framebuffer_views[view_key] = view
+
+        data = view.copy()
+        processing_framebuffer_offsets.put(frame.data_offset)
+
+        # The acquisition loop timestamps readout with time.time_ns() to keep
+        # astropy Time construction out of its critical path
+        read_end_time = Time(frame.read_end_time / 1e9, format='unix')
 
         # Estimate frame end time based on when we finished reading out
-        end_offset = -frame['lineperiod'] * (frame['data_height'] - 2 * (frame['window_region'][2] // 2))
+        end_offset = -frame.lineperiod * (frame.data_height - 2 * (frame.window_region[2] // 2))
 
         # HACK: on SDK versions 22.02.17 and later streamed frames are delayed by an extra frame period
         # (verify by comparing GPS end-time with PC readout end time)
-        if frame['stream']:
-            end_offset -= frame['frameperiod']
+        if frame.stream:
+            end_offset -= frame.frameperiod
 
-        start_offset = end_offset - frame['exposure']
-        end_time = (frame['read_end_time'] + end_offset * u.s).strftime('%Y-%m-%dT%H:%M:%S.%f')
-        start_time = (frame['read_end_time'] + start_offset * u.s).strftime('%Y-%m-%dT%H:%M:%S.%f')
+        start_offset = end_offset - frame.exposure
+        end_time = (read_end_time + end_offset * u.s).strftime('%Y-%m-%dT%H:%M:%S.%f')
+        start_time = (read_end_time + start_offset * u.s).strftime('%Y-%m-%dT%H:%M:%S.%f')
         date_headers = [
             ('DATE-OBS', start_time, '[utc] estimated row 0 exposure start time'),
             ('DATE-END', end_time, '[utc] estimated row 0 exposure end time'),
@@ -172,9 +236,9 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
             # Bogus GPS data may spuriously report a locked status,
             #  so check also against PPSDelta which should be close to 10 MHz.
             if vsync_status == 'LOCKED' and 9000000 < gps.PPSDelta <= 10000500:
-                end_seconds = gps.NowSeconds + frame['readout_offset'] + \
-                              frame['lineperiod'] * 2 * (frame['window_region'][2] // 2)
-                start_time = GPSData.create_timestamp(end_seconds - frame['exposure'], gps.NowCounts)
+                end_seconds = gps.NowSeconds + frame.readout_offset + \
+                              frame.lineperiod * 2 * (frame.window_region[2] // 2)
+                start_time = GPSData.create_timestamp(end_seconds - frame.exposure, gps.NowCounts)
                 end_time = GPSData.create_timestamp(end_seconds, gps.NowCounts)
                 date_headers = [
                     ('DATE-OBS', start_time, '[utc] row 0 exposure start time'),
@@ -194,33 +258,33 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
             ]
 
         # Crop data to window
-        image_region = window_sensor_region(frame['image_region'], frame['window_region'])
-        bias_region = window_sensor_region(frame['bias_region'], frame['window_region'])
-        dark_region = window_sensor_region(frame['dark_region'], frame['window_region'])
-        window_region = frame['window_region']
-        if image_region != frame['image_region']:
+        image_region = window_sensor_region(frame.image_region, frame.window_region)
+        bias_region = window_sensor_region(frame.bias_region, frame.window_region)
+        dark_region = window_sensor_region(frame.dark_region, frame.window_region)
+        window_region = frame.window_region
+        if image_region != frame.image_region:
             # Crop output data
             # NOTE: Rolling shutter correction is handled in the branches above
             data = data[window_region[2]:window_region[3] + 1, window_region[0]:window_region[1] + 1]
 
-        if frame['binning'] > 1:
+        if frame.binning > 1:
             # Create a 4d view of the 2d image, where the two new axes
             # correspond to the pixels that are to be binned in the x and y axes
-            binning = np.array((frame['binning'], frame['binning']))
+            binning = np.array((frame.binning, frame.binning))
             blocked_shape = tuple(data.shape // binning) + tuple(binning)
             blocked_strides = tuple(data.strides * binning) + data.strides
             blocked = as_strided(data, shape=blocked_shape, strides=blocked_strides)
 
-            if frame['binning_method'] == 'sum':
+            if frame.binning_method == 'sum':
                 data = np.sum(blocked, axis=(2, 3), dtype=np.uint32)
             else:
                 data = np.mean(blocked, axis=(2, 3), dtype=np.uint32).astype(np.uint16)
 
-            image_region = bin_sensor_region(image_region, frame['binning'])
-            bias_region = bin_sensor_region(bias_region, frame['binning'])
-            dark_region = bin_sensor_region(dark_region, frame['binning'])
-            window_region[1] = frame['window_region'][0] + blocked_shape[1] * frame['binning'] - 1
-            window_region[3] = frame['window_region'][2] + blocked_shape[0] * frame['binning'] - 1
+            image_region = bin_sensor_region(image_region, frame.binning)
+            bias_region = bin_sensor_region(bias_region, frame.binning)
+            dark_region = bin_sensor_region(dark_region, frame.binning)
+            window_region[1] = frame.window_region[0] + blocked_shape[1] * frame.binning - 1
+            window_region[3] = frame.window_region[2] + blocked_shape[0] * frame.binning - 1
 
         if image_region is not None:
             image_region_header = ('IMAG-RGN', format_sensor_region(image_region),
@@ -240,13 +304,13 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
         else:
             dark_region_header = ('COMMENT', ' DARK-RGN not available', '')
 
-        if frame['cooler_setpoint'] is not None:
-            setpoint_header = ('TEMP-SET', frame['cooler_setpoint'], '[deg c] cmos temperature set point')
+        if frame.cooler_setpoint is not None:
+            setpoint_header = ('TEMP-SET', frame.cooler_setpoint, '[deg c] cmos temperature set point')
         else:
             setpoint_header = ('COMMENT', ' TEMP-SET not available', '')
 
-        if frame['filter']:
-            filter_headers = [('FILTER', frame['filter'], 'filter in light path')]
+        if frame.filter:
+            filter_headers = [('FILTER', frame.filter, 'filter in light path')]
         else:
             filter_headers = []
 
@@ -254,41 +318,41 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
             (None, None, None),
             ('COMMENT', ' ---                DATE/TIME                --- ', ''),
         ] + date_headers + [
-            ('EXPTIME', round(frame['exposure'], 3), '[s] actual exposure length'),
-            ('EXPRQSTD', round(frame['requested_exposure'], 3), '[s] requested exposure length'),
-            ('EXPCADNC', round(frame['frameperiod'], 3), '[s] exposure cadence'),
-            ('ROWDELTA', round(frame['lineperiod'] * 1e6, 3), '[us] rolling shutter unbinned row period'),
-            ('PC-RDEND', frame['read_end_time'].strftime('%Y-%m-%dT%H:%M:%S.%f'),
+            ('EXPTIME', round(frame.exposure, 3), '[s] actual exposure length'),
+            ('EXPRQSTD', round(frame.requested_exposure, 3), '[s] requested exposure length'),
+            ('EXPCADNC', round(frame.frameperiod, 3), '[s] exposure cadence'),
+            ('ROWDELTA', round(frame.lineperiod * 1e6, 3), '[us] rolling shutter unbinned row period'),
+            ('PC-RDEND', read_end_time.strftime('%Y-%m-%dT%H:%M:%S.%f'),
              '[utc] local PC time when readout completed'),
             (None, None, None),
             ('COMMENT', ' ---           CAMERA INFORMATION            --- ', ''),
-            ('SDKVER', frame['sdk_version'], 'QHY SDK version'),
-            ('FWVER', frame['firmware_version'], 'camera firmware version'),
+            ('SDKVER', frame.sdk_version, 'QHY SDK version'),
+            ('FWVER', frame.firmware_version, 'camera firmware version'),
             ('CAMID', camera_id, 'camera identifier'),
             ('CAMERA', camera_device_id, 'camera model and serial number'),
         ] + filter_headers + [
-            ('CAM-MODE', frame['mode'], f'cmos read mode ({frame["mode_name"]})'),
-            ('CAM-TFER', 'STREAM' if frame['stream'] else 'SINGLE', 'frame transfer mode'),
-            ('CAM-GAIN', frame['gain'], 'cmos gain setting'),
-            ('CAM-OFST', frame['offset'], 'cmos offset setting'),
-            ('CAM-TEMP', round(frame['cooler_temperature'], 2),
+            ('CAM-MODE', frame.mode, f'cmos read mode ({frame.mode_name})'),
+            ('CAM-TFER', 'STREAM' if frame.stream else 'SINGLE', 'frame transfer mode'),
+            ('CAM-GAIN', frame.gain, 'cmos gain setting'),
+            ('CAM-OFST', frame.offset, 'cmos offset setting'),
+            ('CAM-TEMP', round(frame.cooler_temperature, 2),
              '[deg c] sensor temperature at end of exposure'),
-            ('TEMP-MOD', CoolerMode.label(frame['cooler_mode']), 'temperature control mode'),
-            ('TEMP-PWR', round(frame['cooler_pwm'] / 2.55), '[%] cooler power'),
+            ('TEMP-MOD', CoolerMode.label(frame.cooler_mode), 'temperature control mode'),
+            ('TEMP-PWR', round(frame.cooler_pwm / 2.55), '[%] cooler power'),
             setpoint_header,
-            ('TEMP-LCK', frame['cooler_mode'] == CoolerMode.Locked, 'cmos temperature is locked to set point'),
-            ('CAM-HUMD', round(frame['cooler_humidity'], 2),
+            ('TEMP-LCK', frame.cooler_mode == CoolerMode.Locked, 'cmos temperature is locked to set point'),
+            ('CAM-HUMD', round(frame.cooler_humidity, 2),
              '[%] sensor humidity at end of exposure'),
-            ('CAM-PRES', round(frame['cooler_pressure'], 1),
+            ('CAM-PRES', round(frame.cooler_pressure, 1),
              '[hPa] sensor pressure at end of exposure'),
-            ('CAM-BIN', frame['binning'], '[px] binning factor'),
-            ('CAM-BMET', frame['binning_method'].upper(), 'binning method (SUM or MEAN)'),
+            ('CAM-BIN', frame.binning, '[px] binning factor'),
+            ('CAM-BMET', frame.binning_method.upper(), 'binning method (SUM or MEAN)'),
             ('CAM-WIND', format_sensor_region(window_region), '[x1:x2,y1:y2] readout region (detector coords)'),
             image_region_header,
             bias_region_header,
             dark_region_header,
-            ('EXPCNT', frame['exposure_count'], 'running exposure count since EXPCREF'),
-            ('EXPCREF', frame['exposure_count_reference'], 'date the exposure counter was reset'),
+            ('EXPCNT', frame.exposure_count, 'running exposure count since EXPCREF'),
+            ('EXPCREF', frame.exposure_count_reference, 'date the exposure counter was reset'),
         ] + gps_headers
 
         hdu = fits.PrimaryHDU(data)
@@ -304,7 +368,7 @@ def output_process(process_queue, processing_framebuffer, processing_framebuffer
 
         # Save errors shouldn't interfere with preview updates, so we use a separate try/catch
         try:
-            filename = f'{camera_id}-{frame["exposure_count"]:08d}.fits'
+            filename = f'{camera_id}-{frame.exposure_count:08d}.fits'
             path = os.path.join(output_path, filename)
 
             # Simulate an atomic write by writing to a temporary file then renaming
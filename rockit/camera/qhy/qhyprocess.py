@@ -22,9 +22,12 @@
 # pylint: disable=too-many-branches
 # pylint: disable=too-many-statements
 
-from ctypes import c_double, c_int, c_uint8, c_uint32, c_void_p
+from ctypes import c_char_p, c_double, c_int, c_uint8, c_uint32, c_void_p, Structure
 from ctypes import byref, create_string_buffer, POINTER
+import dataclasses
 import json
+import struct
+import os
 import pathlib
 import platform
 import sys
@@ -32,11 +35,11 @@ import threading
 import time
 import traceback
 from astropy.time import Time
-import astropy.units as u
 import numpy as np
 import Pyro4
 from rockit.common import log
-from .constants import CommandStatus, CameraStatus, CoolerMode
+from .constants import CameraCommand, CommandStatus, CameraStatus, CoolerMode
+from .outputprocess import FrameMeta
 
 
 class QHYStatus:
@@ -44,6 +47,46 @@ class QHYStatus:
     Error = 0xFFFFFFFF
 
 
+# Prototypes for the SDK functions that return a status code.
+# Declaring argtypes/restype once avoids libffi re-inferring the argument
+# types on every call, and an unsigned restype ensures 0xFFFFFFFF error
+# codes round-trip correctly instead of appearing as -1
+SDK_STATUS_PROTOTYPES = {
+    'InitQHYCCDResource': [],
+    'ReleaseQHYCCDResource': [],
+    'GetQHYCCDId': [c_uint32, c_char_p],
+    'GetQHYCCDSDKVersion': [POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32)],
+    'GetQHYCCDFWVersion': [c_void_p, c_char_p],
+    'GetQHYCCDFPGAVersion': [c_void_p, c_uint8, c_char_p],
+    'SetQHYCCDReadMode': [c_void_p, c_uint32],
+    'GetQHYCCDReadModeName': [c_void_p, c_uint32, c_char_p],
+    'SetQHYCCDStreamMode': [c_void_p, c_uint32],
+    'InitQHYCCD': [c_void_p],
+    'CloseQHYCCD': [c_void_p],
+    'GetQHYCCDChipInfo': [c_void_p, POINTER(c_double), POINTER(c_double), POINTER(c_int), POINTER(c_int),
+                          POINTER(c_double), POINTER(c_double), POINTER(c_int)],
+    'SetQHYCCDParam': [c_void_p, c_int, c_double],
+    'SetQHYCCDResolution': [c_void_p, c_uint32, c_uint32, c_uint32, c_uint32],
+    'SetQHYCCDBitsMode': [c_void_p, c_uint32],
+    'SetQHYCCDSingleFrameTimeOut': [c_void_p, c_uint32],
+    'GetQHYCCDPreciseExposureInfo': [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32),
+                                     POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint8)],
+    'GetQHYCCDRollingShutterEndOffset': [c_void_p, c_uint32, POINTER(c_double)],
+    'BeginQHYCCDLive': [c_void_p],
+    'StopQHYCCDLive': [c_void_p],
+    'ExpQHYCCDSingleFrame': [c_void_p],
+    'CancelQHYCCDExposingAndReadout': [c_void_p],
+    'GetQHYCCDLiveFrame': [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32),
+                           POINTER(c_uint32), POINTER(c_uint8)],
+    'GetQHYCCDSingleFrame': [c_void_p, POINTER(c_uint32), POINTER(c_uint32), POINTER(c_uint32),
+                             POINTER(c_uint32), POINTER(c_uint8)],
+    'IsQHYCCDCFWPlugged': [c_void_p],
+    'GetQHYCCDCFWStatus': [c_void_p, POINTER(c_uint8)],
+    'SendOrder2QHYCCDCFW': [c_void_p, POINTER(c_uint8), c_uint32],
+    'QHYCCDResetFlashULVOError': [c_void_p],
+}
+
+
 class QHYControl:
     GAIN = 6
     OFFSET = 7
@@ -60,13 +103,46 @@ class QHYControl:
     UVLO_STATUS = 67
 
 
+class CoolerTelemetry(Structure):
+    """Cooler readings shared between the cooler thread and status queries.
+       ctypes keeps the doubles naturally aligned, so an unlocked read is a
+       single 8-byte load that cannot observe a torn value on x86-64"""
+    _fields_ = [
+        ('temperature', c_double),
+        ('humidity', c_double),
+        ('pressure', c_double),
+        ('pwm', c_double),
+        ('mode', c_int),
+    ]
+
+
+class _TelemetryField:
+    """Descriptor exposing one CoolerTelemetry field as an instance attribute"""
+    def __init__(self, name):
+        self._name = name
+
+    def __get__(self, obj, objtype=None):
+        return getattr(obj._cooler_telemetry, self._name)
+
+    def __set__(self, obj, value):
+        setattr(obj._cooler_telemetry, self._name, value)
+
+
+# Reusable buffers for SDK calls that return short strings. Every result is
+# copied out with .value.decode() before the next call, and the calls only run
+# from the single-threaded initialization path, so sharing them is safe
+_DEVICE_ID_BUF = create_string_buffer(32)
+_FW_BUF = create_string_buffer(4)
+_MODE_NAME_BUF = create_string_buffer(128)
+
+
 def open_device(driver, camera_device_id):
     """Returns None if device is not found"""
     # Enumerate cameras to find target
     camera_count = driver.ScanQHYCCD()
     print(f'found {camera_count} cameras')
 
-    device_id_buf = create_string_buffer(32)
+    device_id_buf = _DEVICE_ID_BUF
     for i in range(camera_count):
         status = driver.GetQHYCCDId(i, device_id_buf)
         if status != QHYStatus.Success:
@@ -81,6 +157,15 @@ def open_device(driver, camera_device_id):
 
 
 class QHYInterface:
+    # Backed by the CoolerTelemetry structure so that report_status can read
+    # them without taking a lock while the cooler thread may be blocked on a
+    # slow driver call
+    _cooler_temperature = _TelemetryField('temperature')
+    _cooler_humidity = _TelemetryField('humidity')
+    _cooler_pressure = _TelemetryField('pressure')
+    _cooler_pwm = _TelemetryField('pwm')
+    _cooler_mode = _TelemetryField('mode')
+
     def __init__(self, config, processing_queue,
                  processing_framebuffer, processing_framebuffer_offsets,
                  processing_stop_signal):
@@ -96,6 +181,17 @@ class QHYInterface:
         self._readout_width = 0
         self._readout_height = 0
 
+        # Frame download out-parameters, constructed once and reused for every
+        # frame: ctypes object (and byref) construction is expensive enough to
+        # matter in the acquisition loop, and the SDK overwrites the values on
+        # each call anyway
+        self._frame_width = c_uint32()
+        self._frame_height = c_uint32()
+        self._frame_bpp = c_uint32()
+        self._frame_channels = c_uint32()
+        self._frame_dims_refs = (byref(self._frame_width), byref(self._frame_height),
+                                 byref(self._frame_bpp), byref(self._frame_channels))
+
         if config.filters:
             self._filter = config.filters[0]
         else:
@@ -123,12 +219,9 @@ class QHYInterface:
         self._dark_region = [0, 0, 0, 0]
 
         self._cooler_condition = threading.Condition()
+        self._cooler_telemetry = CoolerTelemetry()
         self._cooler_mode = CoolerMode.Unknown
         self._cooler_setpoint = config.cooler_setpoint
-        self._cooler_temperature = 0
-        self._cooler_humidity = 0
-        self._cooler_pressure = 0
-        self._cooler_pwm = 0
 
         self._exposure_time = 1
         self._gain = config.gain
@@ -142,24 +235,56 @@ class QHYInterface:
         # Number of frames acquired this sequence
         self._sequence_frame_count = 0
 
-        # Time that the latest frame in the exposure was started
-        self._sequence_exposure_start_time = Time.now()
+        # Time that the latest frame in the exposure was started (unix nanoseconds)
+        self._sequence_exposure_start_time = time.time_ns()
 
         # Information for building the output filename
         self._output_directory = pathlib.Path(config.output_path)
         self._output_frame_prefix = config.output_prefix
 
-        # Persistent frame counters
+        # Persistent frame counters, stored as a fixed 12-byte binary record
+        # (count, packed yyyymmdd reference date). Rewriting a single block in
+        # place with pwrite is atomic on local filesystems and avoids the json
+        # encode plus rename dance on every flush
         self._counter_filename = config.expcount_path
+        self._counter_fd = None
+        self._counter_dirty = False
+        self._exposure_count = 0
+        self._exposure_count_reference = Time.now().strftime('%Y-%m-%d')
         try:
-            with open(self._counter_filename, 'r', encoding='ascii') as infile:
-                data = json.load(infile)
-                self._exposure_count = data['exposure_count']
-                self._exposure_count_reference = data['exposure_reference']
-        except Exception:
-            now = Time.now().strftime('%Y-%m-%d')
-            self._exposure_count = 0
-            self._exposure_count_reference = now
+            fd = os.open(self._counter_filename, os.O_RDWR | os.O_CREAT, 0o644)
+
+            # Only a binary record is exactly 12 bytes; the legacy json files
+            # were ~55, so the file size discriminates the formats unambiguously
+            # (the first record byte is count & 0xff, so content sniffing cannot)
+            if os.fstat(fd).st_size == 12:
+                count, packed_date = struct.unpack('<QI', os.pread(fd, 12, 0))
+                self._exposure_count = count
+                self._exposure_count_reference = \
+                    f'{packed_date // 10000:04d}-{packed_date // 100 % 100:02d}-{packed_date % 100:02d}'
+            else:
+                # Fall back to the legacy json format (or defaults for a new file)
+                try:
+                    with open(self._counter_filename, 'r', encoding='ascii') as infile:
+                        data = json.load(infile)
+                        self._exposure_count = data['exposure_count']
+                        self._exposure_count_reference = data['exposure_reference']
+                except Exception:
+                    pass
+
+                # The binary record will replace the legacy contents on first flush
+                os.ftruncate(fd, 0)
+                self._counter_dirty = True
+
+            self._counter_fd = fd
+        except OSError as e:
+            # An unreadable or unwritable counter path degrades to in-memory
+            # counters rather than preventing the camera from initializing
+            print('failed to open exposure counter file (' + str(e) + ')')
+
+        # Counter updates are flushed to disk periodically (and on shutdown)
+        # rather than rewriting the file at the end of every sequence
+        threading.Thread(target=self.__counter_flush_thread, daemon=True).start()
 
         # Thread that runs the exposure sequence
         # Initialized by start() method
@@ -187,6 +312,26 @@ class QHYInterface:
 
         threading.Thread(target=self.__cooler_thread, daemon=True).start()
 
+    def _flush_exposure_counter(self):
+        """Writes the exposure counters to disk if they have changed"""
+        if not self._counter_dirty or self._counter_fd is None:
+            return
+
+        self._counter_dirty = False
+        try:
+            year, month, day = (int(x) for x in self._exposure_count_reference.split('-'))
+            record = struct.pack('<QI', self._exposure_count, year * 10000 + month * 100 + day)
+            os.pwrite(self._counter_fd, record, 0)
+            os.fdatasync(self._counter_fd)
+        except Exception as e:
+            print('failed to save exposure counters (' + str(e) + ')')
+
+    def __counter_flush_thread(self):
+        """Periodically flushes the exposure counters to disk"""
+        while True:
+            time.sleep(30)
+            self._flush_exposure_counter()
+
     @property
     def is_acquiring(self):
         return self._acquisition_thread is not None and self._acquisition_thread.is_alive()
@@ -202,62 +347,99 @@ class QHYInterface:
                 print('Resetting UVLO flag')
                 self._driver.QHYCCDResetFlashULVOError(self._handle)
 
+    @staticmethod
+    def _clamp_u8(value):
+        """Clamps a pwm value to the valid 0-255 hardware range"""
+        value = int(value)
+        return 0 if value < 0 else 255 if value > 255 else value
+
+    def __set_cooler_pwm(self, pwm):
+        """Sets the cooler to manual PWM control with the given power"""
+        with self._driver_lock:
+            if self._driver is None:
+                return
+
+            status = self._driver.SetQHYCCDParam(self._handle, QHYControl.MANUALPWM, c_double(pwm))
+
+        if status != QHYStatus.Success:
+            print(f'failed to update cooler PWM control with status {status}')
+
+    def __set_cooler_target(self, target):
+        """Sets the cooler to automatic control with the given target temperature"""
+        with self._driver_lock:
+            if self._driver is None:
+                return
+
+            status = self._driver.SetQHYCCDParam(self._handle, QHYControl.COOLER, c_double(target))
+
+        if status != QHYStatus.Success:
+            print(f'failed to set temperature to {target} with status {status}')
+
     def __cooler_thread(self):
         """Polls and updates cooler status"""
+        last_update = 0
         while True:
+            # Coalesce bursts of setpoint changes: each one notifies the
+            # condition below, but repeated wakeups within 100ms collapse
+            # into a single telemetry and control pass
+            throttle = 0.1 - (time.monotonic() - last_update)
+            if throttle > 0:
+                time.sleep(throttle)
+            last_update = time.monotonic()
+
+            # Snapshot the cooler telemetry under the lock, then run the
+            # control logic and any PWM updates outside it so the lock is
+            # only held for the individual SDK round-trips
             with self._driver_lock:
-                if self._driver is not None:
+                driver_ready = self._driver is not None
+                if driver_ready:
                     # Query temperature status
                     temperature = self._driver.GetQHYCCDParam(self._handle, QHYControl.CURTEMP)
                     humidity = self._driver.GetQHYCCDParam(self._handle, QHYControl.HUMIDITY)
                     pressure = self._driver.GetQHYCCDParam(self._handle, QHYControl.PRESSURE)
                     pwm = self._driver.GetQHYCCDParam(self._handle, QHYControl.CURPWM)
+                    target = self._driver.GetQHYCCDParam(self._handle, QHYControl.COOLER)
+                    uvlo_status = int(self._driver.GetQHYCCDParam(self._handle, QHYControl.UVLO_STATUS))
 
-                    if temperature == float(0xFFFFFFFF) or pwm == float(0xFFFFFFFF):
-                        self._driver_lost_camera = True
-                        return
-
-                    self._cooler_temperature = temperature
-                    self._cooler_humidity = humidity
-                    self._cooler_pressure = pressure
-                    self._cooler_pwm = pwm
+            if driver_ready:
+                if temperature == float(0xFFFFFFFF) or pwm == float(0xFFFFFFFF):
+                    self._driver_lost_camera = True
+                    return
 
-                    if int(self._driver.GetQHYCCDParam(self._handle, QHYControl.UVLO_STATUS)) in [2, 3, 9]:
-                        self._cooler_mode = CoolerMode.UVLOError
-                    elif self._cooler_setpoint is None:
-                        # Ramp the cooler power down over a few update cycles
-                        if self._cooler_pwm > 0:
-                            self._cooler_mode = CoolerMode.Warming
-                            p = max(0, self._cooler_pwm - self._config.cooler_pwm_step)
-                            status = self._driver.SetQHYCCDParam(self._handle, QHYControl.MANUALPWM, c_double(p))
-                            if status != QHYStatus.Success:
-                                print(f'failed to update cooler PWM control with status {status}')
-                        else:
-                            self._cooler_mode = CoolerMode.Warm
+                self._cooler_temperature = temperature
+                self._cooler_humidity = humidity
+                self._cooler_pressure = pressure
+                self._cooler_pwm = pwm
+
+                # UVLO error states 2, 3, 9 tested as a bitmask lookup
+                # (right shift so out-of-range status values simply test false)
+                if (0b1000001100 >> uvlo_status) & 1:
+                    self._cooler_mode = CoolerMode.UVLOError
+                elif self._cooler_setpoint is None:
+                    # Ramp the cooler power down over a few update cycles
+                    if self._cooler_pwm > 0:
+                        self._cooler_mode = CoolerMode.Warming
+                        self.__set_cooler_pwm(self._clamp_u8(self._cooler_pwm - self._config.cooler_pwm_step))
                     else:
-                        temp_delta = abs(self._cooler_temperature - self._cooler_setpoint)
-                        if temp_delta > 5:
-                            # Ramp the cooler power towards the requested temperature over a few update cycles
-                            if self._cooler_temperature > self._cooler_setpoint:
-                                self._cooler_mode = CoolerMode.Cooling
-                                p = min(255, self._cooler_pwm + self._config.cooler_pwm_step)
-                            else:
-                                self._cooler_mode = CoolerMode.Warming
-                                p = max(0, self._cooler_pwm - self._config.cooler_pwm_step)
-
-                            status = self._driver.SetQHYCCDParam(self._handle, QHYControl.MANUALPWM, c_double(p))
-                            if status != QHYStatus.Success:
-                                print(f'failed to update cooler PWM control with status {status}')
+                        self._cooler_mode = CoolerMode.Warm
+                else:
+                    temp_delta = abs(self._cooler_temperature - self._cooler_setpoint)
+                    if temp_delta > 5:
+                        # Ramp the cooler power towards the requested temperature over a few update cycles
+                        if self._cooler_temperature > self._cooler_setpoint:
+                            self._cooler_mode = CoolerMode.Cooling
+                            p = self._clamp_u8(self._cooler_pwm + self._config.cooler_pwm_step)
                         else:
-                            self._cooler_mode = CoolerMode.Locked if temp_delta < 0.5 else CoolerMode.Locking
+                            self._cooler_mode = CoolerMode.Warming
+                            p = self._clamp_u8(self._cooler_pwm - self._config.cooler_pwm_step)
 
-                            target = self._driver.GetQHYCCDParam(self._handle, QHYControl.COOLER)
-                            if abs(target - self._cooler_setpoint) > 0.1:
-                                # Switch to auto control and/or update new target temperature
-                                status = self._driver.SetQHYCCDParam(self._handle, QHYControl.COOLER,
-                                                                     c_double(self._cooler_setpoint))
-                                if status != QHYStatus.Success:
-                                    print(f'failed to set temperature to {self._cooler_setpoint} with status {status}')
+                        self.__set_cooler_pwm(p)
+                    else:
+                        self._cooler_mode = CoolerMode.Locked if temp_delta < 0.5 else CoolerMode.Locking
+
+                        if abs(target - self._cooler_setpoint) > 0.1:
+                            # Switch to auto control and/or update new target temperature
+                            self.__set_cooler_target(self._cooler_setpoint)
 
             with self._cooler_condition:
                 self._cooler_condition.wait(self._config.cooler_update_delay)
@@ -266,6 +448,20 @@ class QHYInterface:
         """Worker thread that acquires frames and their times.
            Tagged frames are pushed to the acquisition queue
            for further processing on another thread"""
+        # Pinning the download thread to a dedicated core and raising its
+        # priority guards against preemption mid-way through the USB transfer,
+        # which risks the SDK overwriting an undownloaded frame
+        if self._config.acquisition_cpu is not None and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, {self._config.acquisition_cpu})
+            except OSError as e:
+                print(f'failed to set acquisition thread affinity ({e})')
+
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+            except OSError as e:
+                print(f'failed to set acquisition thread priority ({e})')
+
         framebuffer_slots = 0
         try:
             with self._driver_lock:
@@ -283,8 +479,15 @@ class QHYInterface:
 
             offset = 0
             frame_size = 2 * self._readout_width * self._readout_height
+
+            # ctypes views into the frame buffer are created once per slot here
+            # and reused for every frame, avoiding a from_buffer construction
+            # (and its libffi type machinery) in the acquisition loop
+            framebuffer_cdata = {}
             while offset + frame_size <= len(self._processing_framebuffer):
                 self._processing_framebuffer_offsets.put(offset)
+                framebuffer_cdata[offset] = (c_uint8 * frame_size).from_buffer(
+                    self._processing_framebuffer, offset)
                 offset += frame_size
                 framebuffer_slots += 1
 
@@ -314,10 +517,7 @@ class QHYInterface:
             is_long_exposure = c_uint8()
             row = c_uint32(0)
             readout_offset_us = c_double()
-            width = c_uint32(self._readout_width)
-            height = c_uint32(self._readout_height)
-            bpp = c_uint32(16)
-            channels = c_uint32(1)
+            width_ref, height_ref, bpp_ref, channels_ref = self._frame_dims_refs
 
             with self._driver_lock:
                 self._driver.GetQHYCCDPreciseExposureInfo(self._handle,
@@ -332,8 +532,51 @@ class QHYInterface:
             with self._driver_lock:
                 self._driver.GetQHYCCDRollingShutterEndOffset(self._handle, row, byref(readout_offset_us))
 
+            # Fields that cannot change while the sequence is running are
+            # filled once into a template; the loop only replaces the handful
+            # of per-frame values, so each frame pickles the same invariant
+            # strings and lists instead of rebuilding the full metadata set
+            frame_template = FrameMeta(
+                data_offset=0,
+                data_width=self._readout_width,
+                data_height=self._readout_height,
+                requested_exposure=float(self._exposure_time),
+                exposure=actual_exposure_us.value / 1e6,
+                lineperiod=line_period_ns.value / 1e9,
+                frameperiod=frame_period_us.value / 1e6,
+                readout_offset=readout_offset_us.value / 1e6,
+                mode=self._config.mode,
+                mode_name=self._mode_name,
+                gain=self._gain,
+                offset=self._offset,
+                stream=self._stream_frames,
+                read_end_time=0,
+                filter=self._filter,
+                sdk_version=self._sdk_version,
+                firmware_version=self._camera_firmware_version,
+                cooler_mode=CoolerMode.Unknown,
+                cooler_temperature=0,
+                cooler_humidity=0,
+                cooler_pressure=0,
+                cooler_pwm=0,
+                cooler_setpoint=self._cooler_setpoint,
+                window_region=self._window_region,
+                binning=self._binning,
+                binning_method=self._binning_method,
+                image_region=self._image_region,
+                bias_region=self._bias_region,
+                dark_region=self._dark_region,
+                exposure_count=0,
+                exposure_count_reference=self._exposure_count_reference)
+
+            # Wait between unsuccessful frame polls instead of spinning at 100% CPU.
+            # Half a frame period keeps added latency below one frame; clamped to
+            # 1-10ms so short exposures still poll often enough and long exposures
+            # remain responsive to the stop signal
+            poll_interval = min(0.01, max(0.001, frame_period_us.value / 2e6))
+
             while not self._stop_acquisition and not self._processing_stop_signal.value:
-                self._sequence_exposure_start_time = Time.now()
+                self._sequence_exposure_start_time = time.time_ns()
                 if not self._stream_frames:
                     # Camera will sometimes return stale data out of the DDR buffer
                     # Resetting DDR flag seems to work for clearing the buffer
@@ -352,21 +595,27 @@ class QHYInterface:
                         break
 
                 framebuffer_offset = self._processing_framebuffer_offsets.get()
-                cdata = (c_uint8 * frame_size).from_buffer(self._processing_framebuffer, framebuffer_offset)
+                cdata = framebuffer_cdata[framebuffer_offset]
 
+                # The frame downloads below run without taking _driver_lock:
+                # the SDK allows parameter queries concurrent with readout, and
+                # holding the lock for the full USB transfer would block the
+                # cooler thread and status queries for up to a frame period.
+                # Only this single acquisition thread ever initiates readout.
                 if self._stream_frames:
                     status = QHYStatus.Error
                     while status != QHYStatus.Success:
-                        with self._driver_lock:
-                            status = self._driver.GetQHYCCDLiveFrame(
-                                self._handle, byref(width), byref(height), byref(bpp), byref(channels), cdata)
+                        status = self._driver.GetQHYCCDLiveFrame(
+                            self._handle, width_ref, height_ref, bpp_ref, channels_ref, cdata)
 
                         if self._stop_acquisition or self._processing_stop_signal.value:
                             break
+
+                        if status != QHYStatus.Success:
+                            time.sleep(poll_interval)
                 else:
-                    with self._driver_lock:
-                        status = self._driver.GetQHYCCDSingleFrame(
-                            self._handle, byref(width), byref(height), byref(bpp), byref(channels), cdata)
+                    status = self._driver.GetQHYCCDSingleFrame(
+                        self._handle, width_ref, height_ref, bpp_ref, channels_ref, cdata)
 
                     # Check for a timed out exposure (all-zero buffer)
                     # The GPS sequence number will never be zero for a real frame
@@ -383,43 +632,25 @@ class QHYInterface:
                     self._processing_framebuffer_offsets.put(framebuffer_offset)
                     break
 
-                read_end_time = Time.now()
-
-                self._processing_queue.put({
-                    'data_offset': framebuffer_offset,
-                    'data_width': self._readout_width,
-                    'data_height': self._readout_height,
-                    'requested_exposure': float(self._exposure_time),
-                    'exposure': actual_exposure_us.value / 1e6,
-                    'lineperiod': line_period_ns.value / 1e9,
-                    'frameperiod': frame_period_us.value / 1e6,
-                    'readout_offset': readout_offset_us.value / 1e6,
-                    'mode': self._config.mode,
-                    'mode_name': self._mode_name,
-                    'gain': self._gain,
-                    'offset': self._offset,
-                    'stream': self._stream_frames,
-                    'read_end_time': read_end_time,
-                    'filter': self._filter,
-                    'sdk_version': self._sdk_version,
-                    'firmware_version': self._camera_firmware_version,
-                    'cooler_mode': self._cooler_mode,
-                    'cooler_temperature': self._cooler_temperature,
-                    'cooler_humidity': self._cooler_humidity,
-                    'cooler_pressure': self._cooler_pressure,
-                    'cooler_pwm': self._cooler_pwm,
-                    'cooler_setpoint': self._cooler_setpoint,
-                    'window_region': self._window_region,
-                    'binning': self._binning,
-                    'binning_method': self._binning_method,
-                    'image_region': self._image_region,
-                    'bias_region': self._bias_region,
-                    'dark_region': self._dark_region,
-                    'exposure_count': self._exposure_count,
-                    'exposure_count_reference': self._exposure_count_reference
-                })
+                # time.time_ns() avoids constructing an astropy Time (and its
+                # ERFA leap-second machinery) in the acquisition loop; the
+                # output workers convert back to a Time off the critical path
+                read_end_time = time.time_ns()
+
+                self._processing_queue.put(dataclasses.replace(
+                    frame_template,
+                    data_offset=framebuffer_offset,
+                    read_end_time=read_end_time,
+                    cooler_mode=self._cooler_mode,
+                    cooler_temperature=self._cooler_temperature,
+                    cooler_humidity=self._cooler_humidity,
+                    cooler_pressure=self._cooler_pressure,
+                    cooler_pwm=self._cooler_pwm,
+                    cooler_setpoint=self._cooler_setpoint,
+                    exposure_count=self._exposure_count))
 
                 self._exposure_count += 1
+                self._counter_dirty = True
                 self._sequence_frame_count += 1
 
                 # Continue exposure sequence?
@@ -432,11 +663,7 @@ class QHYInterface:
                     self._driver.StopQHYCCDLive(self._handle)
 
             # Save updated counts to disk
-            with open(self._counter_filename, 'w', encoding='ascii') as outfile:
-                json.dump({
-                    'exposure_count': self._exposure_count,
-                    'exposure_reference': self._exposure_count_reference,
-                }, outfile)
+            self._flush_exposure_counter()
 
             # Wait for processing to complete
             for _ in range(framebuffer_slots):
@@ -460,7 +687,15 @@ class QHYInterface:
                 driver = CDLL('/usr/lib64/libqhyshim.so')
             # pylint: enable=import-outside-toplevel
 
+            for name, argtypes in SDK_STATUS_PROTOTYPES.items():
+                function = getattr(driver, name)
+                function.argtypes = argtypes
+                function.restype = c_uint32
+
+            driver.ScanQHYCCD.restype = c_uint32
+            driver.OpenQHYCCD.argtypes = [c_char_p]
             driver.OpenQHYCCD.restype = POINTER(c_uint32)
+            driver.GetQHYCCDParam.argtypes = [c_void_p, c_int]
             driver.GetQHYCCDParam.restype = c_double
             handle = None
             initialized = False
@@ -495,28 +730,26 @@ class QHYInterface:
 
                 if 'PCIE' in self._config.camera_device_id:
                     # GetQHYCCDFWVersion always returns 201600 for PCIE-connected cameras.
-                    fwv = create_string_buffer(4)
+                    fwv = _FW_BUF
                     index = c_uint8(0)
                     status = driver.GetQHYCCDFPGAVersion(handle, index, fwv)
                     if status != QHYStatus.Success:
                         print(f'failed to query FPGA version with status {status}')
                         return CommandStatus.Failed
 
-                    year = fwv.raw[0]
-                    month = fwv.raw[1]
-                    day = fwv.raw[2]
+                    year, month, day = struct.unpack_from('BBB', fwv.raw)
                     self._camera_firmware_version = f'20{year:02d}{month:02d}{day:02d}'
                 else:
-                    fwv = create_string_buffer(3)
+                    fwv = _FW_BUF
                     status = driver.GetQHYCCDFWVersion(handle, fwv)
-                    fwv = fwv.raw
                     if status == QHYStatus.Success:
-                        month = fwv[0] & ~0xf0
-                        day = fwv[1]
-                        if (fwv[0] >> 4) <= 9:
-                            year = (fwv[0] >> 4) + 0x10
-                        else:
-                            year = fwv[0] >> 4
+                        packed, day = struct.unpack_from('BB', fwv.raw)
+                        month = packed & 0x0f
+
+                        # High-nibble values 0-9 encode years 2016-2025;
+                        # 10-15 encode 2010-2015 directly
+                        high = packed >> 4
+                        year = high + ((high <= 9) << 4)
 
                         self._camera_firmware_version = f'20{year:02d}{month:02d}{day:02d}'
                     else:
@@ -528,7 +761,7 @@ class QHYInterface:
                     print(f'failed to set read mode with status {status}')
                     return CommandStatus.Failed
 
-                mode_name = create_string_buffer(128)
+                mode_name = _MODE_NAME_BUF
                 status = driver.GetQHYCCDReadModeName(handle, c_uint32(self._config.mode), mode_name)
                 if status != QHYStatus.Success:
                     print(f'failed to query read mode name with status {status}')
@@ -592,7 +825,7 @@ class QHYInterface:
                     print(f'failed to set usbtraffic with status {status}')
                     return CommandStatus.Failed
 
-                status = driver.SetQHYCCDResolution(handle, 0, 0, image_width, image_height)
+                status = driver.SetQHYCCDResolution(handle, 0, 0, image_width.value, image_height.value)
                 if status != QHYStatus.Success:
                     print(f'failed to set readout region with status {status}')
                     return CommandStatus.Failed
@@ -918,7 +1151,7 @@ class QHYInterface:
                 state = CameraStatus.Aborting
             else:
                 if self._sequence_exposure_start_time is not None:
-                    exposure_progress = (Time.now() - self._sequence_exposure_start_time).to(u.s).value
+                    exposure_progress = (time.time_ns() - self._sequence_exposure_start_time) / 1e9
                     if exposure_progress >= self._exposure_time:
                         state = CameraStatus.Reading
 
@@ -945,26 +1178,76 @@ class QHYInterface:
     def shutdown(self):
         """Disconnects from the camera driver"""
         # Complete the current exposure
-        if self._acquisition_thread is not None:
+        # The thread reference is taken locally so a concurrent start_sequence
+        # cannot swap it out between the join and the teardown below
+        thread = self._acquisition_thread
+        self._acquisition_thread = None
+        if thread is not None:
+            # Raise the stop flag before contending for the driver lock: the
+            # acquisition loop checks it without the lock, so it starts
+            # winding down while the cancel call waits its turn
+            self._stop_acquisition = True
             with self._driver_lock:
                 self._driver.CancelQHYCCDExposingAndReadout(self._handle)
             print('shutdown: waiting for acquisition to complete')
-            self._stop_acquisition = True
-            self._acquisition_thread.join()
 
+            # The parent daemon force-terminates this process 4.5 seconds
+            # after requesting shutdown; give up on a wedged driver call
+            # before then so the teardown below still gets a chance to run
+            thread.join(timeout=3)
+            if thread.is_alive():
+                log.warning(self._config.log_name, 'Acquisition thread did not stop in time')
+
+        self._flush_exposure_counter()
+
+        # Snapshot and clear the driver references under the lock, then run
+        # the potentially slow SDK teardown outside it so the cooler thread
+        # can never block behind (or race with) a wedged USB call
         with self._driver_lock:
             print('shutdown: disconnecting driver')
-            self._driver.CloseQHYCCD(self._handle)
-            self._driver.ReleaseQHYCCDResource()
+            driver = self._driver
+            handle = self._handle
             self._driver = None
+            self._handle = c_void_p()
+
+        if driver is not None:
+            driver.CloseQHYCCD(handle)
+            driver.ReleaseQHYCCDResource()
 
         log.info(self._config.log_name, 'Shutdown camera')
         return CommandStatus.Succeeded
 
 
-def qhy_process(camd_pipe, config,
+# Maps pipe command ids to their QHYInterface handler; the message tuple
+# carries the handler arguments positionally, so dispatch is an integer dict
+# lookup with no per-message key or attribute resolution
+_COMMAND_DISPATCH = {
+    CameraCommand.Temperature: QHYInterface.set_target_temperature,
+    CameraCommand.Stream: QHYInterface.set_frame_streaming,
+    CameraCommand.Gain: QHYInterface.set_gain,
+    CameraCommand.Offset: QHYInterface.set_offset,
+    CameraCommand.Exposure: QHYInterface.set_exposure,
+    CameraCommand.Window: QHYInterface.set_window,
+    CameraCommand.Binning: QHYInterface.set_binning,
+    CameraCommand.Start: QHYInterface.start_sequence,
+    CameraCommand.Stop: QHYInterface.stop_sequence,
+    CameraCommand.Filter: QHYInterface.set_filter,
+    CameraCommand.Status: QHYInterface.report_status,
+}
+
+
+def qhy_process(camd_recv, camd_send, config,
                 processing_queue, processing_framebuffer, processing_framebuffer_offsets,
                 stop_signal):
+    # Keep the whole camera process on the configured core so the pipe,
+    # cooler, and framebuffer traffic stay local to the acquisition thread
+    # (which additionally raises its own priority when a sequence starts)
+    if config.acquisition_cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {config.acquisition_cpu})
+        except OSError as e:
+            print(f'failed to set camera process affinity ({e})')
+
     cam = QHYInterface(config, processing_queue, processing_framebuffer, processing_framebuffer_offsets, stop_signal)
     ret = cam.initialize()
 
@@ -972,52 +1255,56 @@ def qhy_process(camd_pipe, config,
     if ret == CommandStatus.Succeeded:
         cam.reset_uvlo()
 
-    camd_pipe.send(ret)
+    camd_send.send(ret)
     if ret != CommandStatus.Succeeded:
         return
 
     try:
-        while True:
-            if camd_pipe.poll(timeout=1):
-                c = camd_pipe.recv()
-                command = c['command']
-                args = c['args']
-
-                if command == 'temperature':
-                    camd_pipe.send(cam.set_target_temperature(args['temperature'], args['quiet']))
-                elif command == 'stream':
-                    camd_pipe.send(cam.set_frame_streaming(args['stream'], args['quiet']))
-                elif command == 'gain':
-                    camd_pipe.send(cam.set_gain(args['gain'], args['quiet']))
-                elif command == 'offset':
-                    camd_pipe.send(cam.set_offset(args['offset'], args['quiet']))
-                elif command == 'exposure':
-                    camd_pipe.send(cam.set_exposure(args['exposure'], args['quiet']))
-                elif command == 'window':
-                    camd_pipe.send(cam.set_window(args['window'], args['quiet']))
-                elif command == 'binning':
-                    camd_pipe.send(cam.set_binning(args['binning'], args['method'], args['quiet']))
-                elif command == 'start':
-                    camd_pipe.send(cam.start_sequence(args['count'], args['quiet']))
-                elif command == 'stop':
-                    camd_pipe.send(cam.stop_sequence(args['quiet']))
-                elif command == 'filter':
-                    camd_pipe.send(cam.set_filter(args['filter_name'], args['quiet']))
-                elif command == 'status':
-                    camd_pipe.send(cam.report_status())
-                elif command == 'shutdown':
+        exit_loop = False
+        while not exit_loop:
+            if not camd_recv.poll(timeout=1):
+                continue
+
+            # Drain all queued commands in a single wakeup so a burst from a
+            # client script (gain + offset + exposure + start) is handled in
+            # one poll cycle. The drain is bounded so a command flood cannot
+            # monopolize the loop
+            drained = 0
+            while True:
+                command, *args = camd_recv.recv()
+
+                if command == CameraCommand.Shutdown:
+                    exit_loop = True
                     break
-                else:
+
+                handler = _COMMAND_DISPATCH.get(command)
+                if handler is None:
                     print(f'unhandled command: {command}')
-                    camd_pipe.send(CommandStatus.Failed)
+                    camd_send.send(CommandStatus.Failed)
+                else:
+                    # A failure inside one handler should fail that command,
+                    # not take down the whole control loop
+                    try:
+                        camd_send.send(handler(cam, *args))
+                    except Exception as e:
+                        log.error(config.log_name, f'command {command} failed: {e!r}')
+                        camd_send.send(CommandStatus.Failed)
 
                 if cam.driver_lost_camera:
                     log.error(config.log_name, 'camera has disappeared')
+                    exit_loop = True
+                    break
+
+                drained += 1
+                if drained >= 32 or not camd_recv.poll(0):
                     break
 
     except Exception:
+        # Anything reaching here is a pipe or loop-level failure; the daemon
+        # detects the process exiting, so replying on a possibly-broken pipe
+        # would only mask the original error
         traceback.print_exc(file=sys.stdout)
-        camd_pipe.send(CommandStatus.Failed)
 
-    camd_pipe.close()
+    camd_recv.close()
+    camd_send.close()
     cam.shutdown()